@@ -0,0 +1,146 @@
+import sys
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+from collections import Counter
+from itertools import combinations
+from typing import Callable, Dict, List
+from xml.sax.saxutils import escape, quoteattr
+
+from row_processor import parse, process_post, process_post_hashed
+from minhash import str_to_int32, make_hash_params, create_minhash, create_oph_minhash
+from signatures import pack_lsh_record
+from lsh_evaluate import local_buckets
+
+_WORDS = ("python java query index table join spark cluster memory thread value error "
+          "function class method string list array file server client request response "
+          "database cache network version install build compile debug test deploy").split()
+
+
+def generate_posts_xml(path: str, num_posts: int, words_per_post: int = 120, code_fraction: float = 0.3,
+                       duplicate_fraction: float = 0.1, seed: int = 42) -> int:
+    """Write a synthetic StackExchange-style Posts.xml and return its size in bytes.
+
+    Bodies are HTML paragraphs with entities, links and (for `code_fraction` of
+    the posts) code blocks. `duplicate_fraction` of the posts are edited copies
+    of earlier posts, so the LSH stages find candidate pairs.
+    """
+    rng = random.Random(seed)
+    bodies: List[List[str]] = []
+    with open(path, "w", encoding="utf-8") as out:
+        out.write('<?xml version="1.0" encoding="utf-8"?>\n<posts>\n')
+        for pid in range(1, num_posts + 1):
+            if bodies and rng.random() < duplicate_fraction:
+                words = list(rng.choice(bodies))
+                for _ in range(len(words) // 10):
+                    words[rng.randrange(len(words))] = rng.choice(_WORDS)
+            else:
+                words = [rng.choice(_WORDS) for _ in range(words_per_post)]
+            bodies.append(words)
+
+            half = len(words) // 2
+            html = (f"<p>{' '.join(words[:half])} &amp; <a href=\"https://example.com/{pid}\">link</a></p>\n"
+                    f"<p>{' '.join(words[half:])} &lt;tag&gt;</p>\n")
+            if rng.random() < code_fraction:
+                html += f"<pre><code>for x in {rng.choice(_WORDS)}:\n    print(x)\n</code></pre>\n"
+            out.write(f'  <row Id="{pid}" PostTypeId="1" Score="{rng.randint(-5, 100)}" '
+                      f'Body={quoteattr(html)} Title="{escape(" ".join(words[:8]))}" />\n')
+        out.write('</posts>\n')
+    return os.path.getsize(path)
+
+
+def _measure(fn: Callable, memory: bool):
+    """Run `fn` and return (result, seconds, peak traced MB or None)."""
+    if not memory:
+        start = time.perf_counter()
+        result = fn()
+        return result, time.perf_counter() - start, None
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, None, peak / 2**20
+
+
+def run_stages(xml_path: str, num_minhashes: int = 45, bands: int = 15, rows: int = 3) -> List[Dict]:
+    """Time every pipeline stage separately and return one report entry per stage.
+
+    Each stage runs twice: once untraced for the timing and once under
+    tracemalloc for the peak memory, because tracing slows Python down.
+    """
+    hash_params = make_hash_params(num_minhashes)
+    report = []
+
+    def stage(name: str, fn: Callable, input_mb: float = None):
+        result, seconds, _ = _measure(fn, memory=False)
+        _, _, peak_mb = _measure(fn, memory=True)
+        report.append({"stage": name, "seconds": seconds, "input_mb": input_mb, "peak_mb": peak_mb})
+        return result
+
+    xml_rows = stage("parse", lambda: [dict(attrs) for attrs in parse(xml_path)],
+                     os.path.getsize(xml_path) / 2**20)
+    posts = stage("process_post", lambda: [process_post(attrs, k=5) for attrs in xml_rows],
+                  sum(len(attrs.get("Body", "")) for attrs in xml_rows) / 2**20)
+    stage("process_post_hashed", lambda: [process_post_hashed(attrs, k=5) for attrs in xml_rows],
+          sum(len(attrs.get("Body", "")) for attrs in xml_rows) / 2**20)
+    hashed = stage("hash", lambda: {pid: [str_to_int32(s) for s in shingles] for pid, shingles in posts if pid},
+                   sum(len(s) for _, shingles in posts for s in shingles) / 2**20)
+    sigs = stage("create_minhash", lambda: {pid: create_minhash(h, hash_params) for pid, h in hashed.items()})
+    stage("create_oph_minhash", lambda: {pid: create_oph_minhash(h, num_minhashes) for pid, h in hashed.items()})
+    records = stage("pack_lsh_record", lambda: {pid: pack_lsh_record(sig, bands, rows) for pid, sig in sigs.items()})
+    buckets = stage("lsh_bucket_pairs", lambda: local_buckets(records, bands, rows))
+    stage("pair_counts", lambda: Counter(tuple(sorted(pair)) for ids in buckets.values() if len(ids) > 1
+                                         for pair in combinations(ids, 2)))
+
+    for entry in report:
+        seconds = entry["seconds"]
+        entry["posts_per_s"] = len(xml_rows) / seconds if seconds else None
+        entry["mb_per_s"] = entry["input_mb"] / seconds if entry["input_mb"] is not None and seconds else None
+    return report
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main(num_posts: int, output_path: str, xml_path: str = "data/bench_posts.xml"):
+    os.makedirs(os.path.dirname(xml_path) or ".", exist_ok=True)
+    print(f'Generating {num_posts} posts in {xml_path}')
+    xml_bytes = generate_posts_xml(xml_path, num_posts)
+    stages = run_stages(xml_path)
+    for s in stages:
+        mb_per_s = f"{s['mb_per_s']:8.2f} MB/s" if s['mb_per_s'] is not None else " " * 13
+        print(f"{s['stage']:>20}: {s['seconds']:8.3f}s, {s['posts_per_s']:10.0f} posts/s, {mb_per_s}, "
+              f"peak {s['peak_mb']:8.1f} MB")
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "num_posts": num_posts,
+        "xml_bytes": xml_bytes,
+        "stages": stages,
+    }
+    with open(output_path, "w") as out:
+        json.dump(report, out, indent=2)
+    print(f'Saved report to {output_path}')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        print('Usage: python benchmark.py num_posts output.json [posts.xml]')
+        sys.exit(1)
+    num_posts = int(sys.argv[1])
+    output_path = sys.argv[2]
+    if len(sys.argv) > 3:
+        main(num_posts, output_path, sys.argv[3])
+    else:
+        main(num_posts, output_path)
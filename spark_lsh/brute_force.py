@@ -2,13 +2,12 @@ import sys
 import random
 from typing import Iterator, List, Sequence, Set, Tuple
 import numpy as np
-import matplotlib.pyplot as plt
 
 
 def sample_posts_from_file(path: str, numposts: int, sample_size: int) -> List[Tuple[str, Set[str]]]:
     """Sample posts from a txt file and return list of (id, shingles_set)."""
     posts = []
-    indices = random.sample(range(num_posts), sample_size)
+    indices = set(random.sample(range(numposts), sample_size))
     count = 0
     with open(path) as dataset:
         for line in dataset:
@@ -45,6 +44,8 @@ def compute_similarity_list(items: Sequence[Tuple[str, Set[str]]]) -> List[float
 
 
 def plot_similarity_hist(similarities: List[float], name: str, output_path: str, bin_size: float = 0.02) -> None:
+    import matplotlib.pyplot as plt  # only needed for plotting, jaccard is also used on the executors
+
     bins = np.arange(0.0, 1.0 + bin_size, bin_size)
     plt.figure(figsize=(8, 6))
     plt.hist(similarities, bins=bins, edgecolor='black')
@@ -1,10 +1,14 @@
 import sys
-from row_processor import parse, process_post
+from row_processor import parse, process_post, process_post_hashed
 
-def main(input_path, output_path):
+def main(input_path, output_path, hashed=False):
     with open(output_path, mode="w") as output:
-        for attrs in parse(input_path):
-            pid, shingles = process_post(attrs, k=5)
+        for attrs in parse(input_path, fields=("Id", "Body")):
+            if hashed:
+                pid, shingles = process_post_hashed(attrs, k=5)
+                shingles = map(str, shingles.tolist())
+            else:
+                pid, shingles = process_post(attrs, k=5)
             if pid is None:
                 continue
             output.write(pid)
@@ -16,8 +20,9 @@ def main(input_path, output_path):
 
 if __name__ == '__main__':
     if len(sys.argv) < 3:
-        print('Usage: python convert_xml.py input.xml output.txt')
+        print('Usage: python convert_xml.py input.xml[.7z|.bz2|.gz|.zst] output.txt [hashed]')
         sys.exit(1)
     input_path = sys.argv[1]
     output_path = sys.argv[2]
-    main(input_path, output_path)
\ No newline at end of file
+    hashed = len(sys.argv) > 3 and sys.argv[3] == "hashed"
+    main(input_path, output_path, hashed)
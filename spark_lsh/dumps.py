@@ -0,0 +1,136 @@
+import bz2
+import gzip
+import io
+import os
+import re
+import shutil
+import subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from typing import BinaryIO, Iterable, Iterator, List
+
+# Start of a bz2 stream: "BZh" + block size, followed by the first block magic (pi)
+_BZ2_STREAM = re.compile(rb"BZh[1-9]\x31\x41\x59\x26\x53\x59")
+
+
+class _ChunkReader(io.RawIOBase):
+    """Read-only binary stream over an iterator of byte chunks."""
+
+    def __init__(self, chunks: Iterable[bytes], on_close=None):
+        self._chunks = iter(chunks)
+        self._buf = memoryview(b"")
+        self._on_close = on_close
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buf:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._buf = memoryview(chunk)
+        n = min(len(b), len(self._buf))
+        b[:n] = self._buf[:n]
+        self._buf = self._buf[n:]
+        return n
+
+    def close(self):
+        if not self.closed and self._on_close is not None:
+            self._on_close()
+        super().close()
+
+
+def _file_chunks(fp: BinaryIO, size: int) -> Iterator[bytes]:
+    return iter(lambda: fp.read(size), b"")
+
+
+def _bz2_segments(first: bytes, fp: BinaryIO, segment_size: int) -> Iterator[bytes]:
+    """Split a multi-stream bz2 file into segments of whole streams of about `segment_size` bytes."""
+    buf = first
+    for chunk in _file_chunks(fp, segment_size):
+        buf += chunk
+        starts = [match.start() for match in _BZ2_STREAM.finditer(buf, 1)]
+        if starts:
+            yield buf[:starts[-1]]
+            buf = buf[starts[-1]:]
+    if buf:
+        yield buf
+
+
+def _bz2_chunks(path: str, workers: int, segment_size: int) -> Iterator[bytes]:
+    """Decompressed data of a bz2 file, decompressing several streams at once if it has them.
+
+    The StackExchange and Wikipedia dumps consist of many concatenated bz2
+    streams. These are cut at stream boundaries and decompressed in a thread
+    pool (`bz2` releases the GIL), keeping the output in order. A single-stream
+    file is decompressed sequentially.
+    """
+    with open(path, "rb") as fp:
+        first = fp.read(segment_size)
+        if not _BZ2_STREAM.search(first, 1):
+            with bz2.BZ2File(_ChunkReader(chain([first], _file_chunks(fp, segment_size)))) as f:
+                yield from _file_chunks(f, segment_size)
+            return
+
+        with ThreadPoolExecutor(workers) as pool:
+            pending = deque()
+            for segment in _bz2_segments(first, fp, segment_size):
+                pending.append(pool.submit(bz2.decompress, segment))
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+
+def _command_reader(args: List[str]) -> BinaryIO:
+    """Stream the stdout of a decompression command, which runs in parallel with the caller."""
+    proc = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+    def chunks():
+        yield from _file_chunks(proc.stdout, 1 << 20)
+        if proc.wait() != 0:
+            raise IOError(f"{' '.join(args)} exited with code {proc.returncode}")
+
+    def close():
+        proc.stdout.close()
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+
+    return io.BufferedReader(_ChunkReader(chunks(), on_close=close), buffer_size=1 << 20)
+
+
+def open_dump(path: str, member: str = "Posts.xml", workers: int = None,
+              segment_size: int = 1 << 24) -> BinaryIO:
+    """Open a (compressed) StackExchange dump file as a binary stream.
+
+    Supports plain XML and `.7z` (via the `7z` command, extracting only
+    `member`), `.bz2` (parallel for multi-stream files), `.gz` (via `pigz` if
+    available) and `.zst` (via the `zstandard` package or the `zstd` command).
+    """
+    workers = workers or os.cpu_count() or 1
+    ext = os.path.splitext(path)[1].lower()
+
+    if ext == ".7z":
+        exe = shutil.which("7z") or shutil.which("7za") or shutil.which("7zz")
+        if exe is None:
+            raise RuntimeError("Reading .7z dumps requires the 7z command (p7zip)")
+        return _command_reader([exe, "e", "-so", path, member])
+    if ext == ".bz2":
+        return io.BufferedReader(_ChunkReader(_bz2_chunks(path, workers, segment_size)), buffer_size=1 << 20)
+    if ext == ".gz":
+        if shutil.which("pigz"):
+            return _command_reader(["pigz", "-dc", path])
+        return gzip.open(path, "rb")
+    if ext == ".zst":
+        try:
+            import zstandard
+        except ImportError:
+            if shutil.which("zstd"):
+                return _command_reader(["zstd", "-dc", path])
+            raise RuntimeError("Reading .zst dumps requires the zstandard package or the zstd command")
+        fp = open(path, "rb")
+        return zstandard.ZstdDecompressor().stream_reader(fp, closefd=True)
+    return open(path, "rb")
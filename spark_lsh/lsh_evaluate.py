@@ -0,0 +1,114 @@
+import sys
+import time
+from collections import defaultdict
+from itertools import combinations
+from typing import Dict, Iterable, List, Sequence, Set, Tuple, Union
+
+from brute_force import sample_posts_from_file, compute_all_pairwise_sims
+from minhash import str_to_int32, make_hash_params, create_minhash, create_oph_minhash
+from signatures import band_hashes, record_bands
+
+Pair = Tuple[str, str]
+
+
+def local_signatures(posts: Sequence[Tuple[str, Set[str]]], num_minhashes: int,
+                     scheme: str = "permutations", seed: int = 42) -> Dict[str, List[int]]:
+    """MinHash signatures of sampled posts, computed the same way as in the Spark notebook."""
+    hash_params = make_hash_params(num_minhashes, seed)
+    sigs = {}
+    for pid, shingles in posts:
+        hashes = [str_to_int32(s) for s in shingles]
+        if scheme == "oph":
+            sigs[pid] = create_oph_minhash(hashes, num_minhashes, seed)
+        else:
+            sigs[pid] = create_minhash(hashes, hash_params)
+    return sigs
+
+
+def local_buckets(sigs: Dict[str, Union[Sequence[int], bytes]], bands: int, rows: int) -> Dict[tuple, List[str]]:
+    """Map every (band, bucket hash) bucket to the posts in it.
+
+    Takes signatures or packed LSH records (`signatures.pack_lsh_record`), and
+    uses the same band hashes as the Spark notebook.
+    """
+    buckets = defaultdict(list)
+    for pid, sig in sigs.items():
+        if isinstance(sig, bytes):
+            hashes = record_bands(sig)
+            if len(hashes) != bands:
+                raise ValueError(f'record of post {pid} has {len(hashes)} bands, expected {bands}')
+        else:
+            hashes = band_hashes(sig, bands, rows)
+        for band, bucket_hash in enumerate(hashes.tolist()):
+            buckets[(band, bucket_hash)].append(pid)
+    return buckets
+
+
+def local_candidate_pairs(sigs: Dict[str, Union[Sequence[int], bytes]], bands: int, rows: int) -> Set[Pair]:
+    """Pairs of posts that share at least one band of `rows` signature values."""
+    candidates = set()
+    for ids in local_buckets(sigs, bands, rows).values():
+        if len(ids) > 1:
+            candidates.update(tuple(sorted(pair)) for pair in combinations(ids, 2))
+    return candidates
+
+
+def exact_pairs(posts: Sequence[Tuple[str, Set[str]]], thresholds: Iterable[float]) -> Dict[float, Set[Pair]]:
+    """Brute-force ground truth: all pairs with Jaccard similarity >= t, per threshold."""
+    thresholds = sorted(thresholds)
+    truth = {t: set() for t in thresholds}
+    for id1, id2, sim in compute_all_pairwise_sims(posts):
+        if sim < thresholds[0]:
+            continue
+        pair = tuple(sorted((id1, id2)))
+        for t in thresholds:
+            if sim >= t:
+                truth[t].add(pair)
+    return truth
+
+
+def evaluate(posts: Sequence[Tuple[str, Set[str]]], settings: Sequence[Tuple[int, int]],
+             thresholds: Sequence[float], scheme: str = "permutations") -> List[Tuple]:
+    """Return (bands, rows, t, recall, precision, num_candidates) for every setting and threshold."""
+    truth = exact_pairs(posts, thresholds)
+
+    # With independent hash functions a shorter signature is a prefix of a longer one
+    if scheme == "permutations":
+        longest = local_signatures(posts, max(b * r for b, r in settings), scheme)
+        sigs_for = lambda k: longest
+    else:
+        sigs_for = lambda k: local_signatures(posts, k, scheme)
+
+    results = []
+    for bands, rows in settings:
+        candidates = local_candidate_pairs(sigs_for(bands * rows), bands, rows)
+        for t in thresholds:
+            found = len(candidates & truth[t])
+            recall = found / len(truth[t]) if truth[t] else 1.0
+            precision = found / len(candidates) if candidates else 1.0
+            results.append((bands, rows, t, recall, precision, len(candidates)))
+    return results
+
+
+def main(dataset: str, num_posts: int, sample_size: int = 1000, scheme: str = "permutations"):
+    settings = [(bands, rows) for rows in (2, 3, 4, 5) for bands in (10, 15, 20, 30)]
+    thresholds = [0.2, 0.4, 0.6, 0.8]
+
+    start = time.perf_counter()
+    print(f'Sampling {sample_size} posts from {dataset}')
+    sampled = sample_posts_from_file(dataset, num_posts, sample_size)
+    for bands, rows, t, recall, precision, num_candidates in evaluate(sampled, settings, thresholds, scheme):
+        print(f"b = {bands:3d}, r = {rows:2d}, t = {t:.1f}: recall = {recall:.3f}, "
+              f"precision = {precision:.3f}, candidates = {num_candidates}")
+    print(f'Done in {time.perf_counter() - start:.1f}s')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        print('Usage: python lsh_evaluate.py input.txt num_posts [sample_size] [permutations|oph]')
+        sys.exit(1)
+    input_path = sys.argv[1]
+    num_posts = int(sys.argv[2])
+    sample_size = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+    scheme = sys.argv[4] if len(sys.argv) > 4 else "permutations"
+    main(input_path, num_posts, sample_size, scheme)
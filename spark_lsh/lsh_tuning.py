@@ -0,0 +1,119 @@
+import sys
+import warnings
+from typing import List, NamedTuple, Sequence, Tuple
+import numpy as np
+
+
+class LshSetting(NamedTuple):
+    bands: int
+    rows: int
+    recall: float               # expected fraction of pairs with s >= t that become candidates
+    false_negative_rate: float  # 1 - recall
+    false_positive_rate: float  # expected fraction of candidates with s < t
+    expected_candidates: float  # expected number of candidate pairs on the full corpus
+    cost: float
+
+
+def similarity_histogram(similarities: Sequence[float], bin_size: float = 0.01) -> Tuple[np.ndarray, np.ndarray]:
+    """Return (bin_midpoints, pair_counts) of a list of pairwise Jaccard similarities."""
+    bins = np.arange(0.0, 1.0 + bin_size, bin_size)
+    counts, edges = np.histogram(similarities, bins=bins)
+    return (edges[:-1] + edges[1:]) / 2, counts.astype(float)
+
+
+def s_curve(s: np.ndarray, bands: int, rows: int) -> np.ndarray:
+    """Probability that a pair with similarity `s` shares at least one band."""
+    return 1.0 - (1.0 - s ** rows) ** bands
+
+
+def analytic_recall(t: float, bands: int, rows: int, steps: int = 1000) -> float:
+    """Mean of the S-curve over [t, 1], the recall if similarities above t are uniform."""
+    return float(s_curve(np.linspace(t, 1.0, steps + 1), bands, rows).mean())
+
+
+def evaluate_setting(histogram: Tuple[np.ndarray, np.ndarray], t: float, bands: int, rows: int,
+                     sample_size: int, num_posts: int,
+                     minhash_cost: float = 1.0, pair_cost: float = 1.0,
+                     min_true_pairs: int = 30) -> LshSetting:
+    """Integrate the S-curve for `bands` x `rows` over a sampled similarity histogram.
+
+    Pair counts are scaled from a sample of `sample_size` posts to `num_posts`.
+    The cost model is `minhash_cost` per signature value plus `pair_cost` per
+    candidate pair. When the sample has fewer than `min_true_pairs` pairs with
+    s >= t (near-duplicates are rare in random samples), the recall is the
+    analytic `analytic_recall` instead, and a warning is issued.
+    """
+    sims, counts = histogram
+    scale = (num_posts * (num_posts - 1)) / max(sample_size * (sample_size - 1), 1)
+    p = s_curve(sims, bands, rows) * counts
+    above = sims >= t
+
+    true_pairs = counts[above].sum()
+    true_found = p[above].sum()
+    false_found = p[~above].sum()
+    candidates = true_found + false_found
+
+    if true_pairs < min_true_pairs:
+        warnings.warn(f'only {true_pairs:.0f} sampled pairs with similarity >= {t}, using the '
+                      f'S-curve over [{t}, 1] for the recall; use a larger sample for a reliable estimate')
+        recall = analytic_recall(t, bands, rows)
+        true_found = recall * true_pairs
+        candidates = true_found + false_found
+    else:
+        recall = true_found / true_pairs
+    fp_rate = false_found / candidates if candidates > 0 else 0.0
+    expected_candidates = candidates * scale
+    cost = minhash_cost * num_posts * bands * rows + pair_cost * expected_candidates
+    return LshSetting(bands, rows, recall, 1.0 - recall, fp_rate, expected_candidates, cost)
+
+
+def tune(histogram: Tuple[np.ndarray, np.ndarray], t: float, max_fn: float, max_fp: float,
+         sample_size: int, num_posts: int, max_signature: int = 200, max_rows: int = 20,
+         minhash_cost: float = 1.0, pair_cost: float = 1.0, min_true_pairs: int = 30) -> List[LshSetting]:
+    """Return all (bands, rows) settings with bands * rows <= `max_signature`, best first.
+
+    Settings within the false-negative and false-positive budgets come first,
+    ordered by cost. Settings outside the budgets follow, ordered by how far they
+    exceed it.
+    """
+    settings = []
+    for rows in range(1, max_rows + 1):
+        for bands in range(1, max_signature // rows + 1):
+            settings.append(evaluate_setting(histogram, t, bands, rows, sample_size, num_posts,
+                                             minhash_cost, pair_cost, min_true_pairs))
+
+    def excess(s: LshSetting) -> float:
+        return max(s.false_negative_rate - max_fn, 0.0) + max(s.false_positive_rate - max_fp, 0.0)
+
+    return sorted(settings, key=lambda s: (excess(s), s.cost))
+
+
+def print_settings(settings: Sequence[LshSetting], t: float) -> None:
+    for s in settings:
+        print(f"b = {s.bands:3d}, r = {s.rows:2d} (signature {s.bands * s.rows:3d}), "
+              f"(1/b)^(1/r) = {(1 / s.bands) ** (1 / s.rows):.3f}, t = {t}, "
+              f"recall = {s.recall:.3f}, fp rate = {s.false_positive_rate:.3f}, "
+              f"candidates = {s.expected_candidates:.3g}")
+
+
+def main(dataset: str, num_posts: int, t: float, max_fn: float, max_fp: float, sample_size: int = 1000):
+    from brute_force import sample_posts_from_file, compute_similarity_list
+
+    print(f'Sampling {sample_size} posts from {dataset}')
+    sampled = sample_posts_from_file(dataset, num_posts, sample_size)
+    histogram = similarity_histogram(compute_similarity_list(sampled))
+    settings = tune(histogram, t, max_fn, max_fp, sample_size, num_posts)
+    print_settings(settings[:10], t)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 6:
+        print('Usage: python lsh_tuning.py input.txt num_posts t max_fn max_fp [sample_size]')
+        sys.exit(1)
+    input_path = sys.argv[1]
+    num_posts = int(sys.argv[2])
+    t = float(sys.argv[3])
+    max_fn = float(sys.argv[4])
+    max_fp = float(sys.argv[5])
+    sample_size = int(sys.argv[6]) if len(sys.argv) > 6 else 1000
+    main(input_path, num_posts, t, max_fn, max_fp, sample_size)
@@ -0,0 +1,53 @@
+from typing import Callable, Dict, Iterable, Iterator, Sequence, Tuple
+from pyspark.rdd import portable_hash
+from brute_force import jaccard
+from minhash import minhash_similarity
+
+Pair = Tuple[int, int]
+
+
+def _verify_group(pairs: Iterable[Tuple[Pair, int]], posts: Iterable[Tuple[int, tuple]],
+                  t: float, estimate: Callable) -> Iterator[Tuple[Pair, Tuple[float, int, float]]]:
+    """Score all candidate pairs of one group against the posts shipped to that group."""
+    lookup: Dict[int, Tuple[set, Sequence[int]]] = {
+        pid: (set(shingles), sig) for pid, (shingles, sig) in posts
+    }
+    for (i, j), count in pairs:
+        shingles_i, sig_i = lookup[i]
+        shingles_j, sig_j = lookup[j]
+        sim = jaccard(shingles_i, shingles_j)
+        if sim >= t:
+            yield (i, j), (sim, count, estimate(sig_i, sig_j))
+
+
+def verify_candidates(pair_counts, hashed_shingles, minhash_sigs, t: float, num_partitions: int = None,
+                      estimate: Callable = minhash_similarity):
+    """Compute the exact Jaccard similarity of every LSH candidate pair on the executors.
+
+    `pair_counts` is an RDD of ((i, j), band_collisions), `hashed_shingles` and
+    `minhash_sigs` are RDDs keyed by post id. Every candidate pair is assigned to
+    one of `num_partitions` groups, and each post's shingles and signature are
+    shipped once to every group that references it (instead of once per pair).
+    `estimate` computes the MinHash similarity of two signatures, e.g.
+    `signatures.estimate_similarity` for packed (b-bit) signatures.
+
+    Returns an RDD of ((i, j), (jaccard, band_collisions, minhash_similarity))
+    containing only the pairs with jaccard >= t.
+    """
+    n = num_partitions or pair_counts.getNumPartitions()
+
+    # (group, ((i, j), count))
+    grouped_pairs = pair_counts.map(lambda kv: (portable_hash(kv[0]) % n, kv))
+
+    # (post_id, group) for every group that needs the post
+    needed = (grouped_pairs
+              .flatMap(lambda kv: ((kv[1][0][0], kv[0]), (kv[1][0][1], kv[0])))
+              .distinct(n))
+
+    # (group, (post_id, (shingles, sig)))
+    posts = hashed_shingles.join(minhash_sigs, n)
+    shipped = needed.join(posts, n).map(lambda kv: (kv[1][0], (kv[0], kv[1][1])))
+
+    return (grouped_pairs
+            .cogroup(shipped, n)
+            .flatMap(lambda kv: _verify_group(kv[1][0], kv[1][1], t, estimate)))
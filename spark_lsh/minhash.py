@@ -0,0 +1,163 @@
+import sys
+import random
+import hashlib
+import time
+from functools import lru_cache
+from typing import List, Sequence, Tuple
+import numpy as np
+
+p = 2**61 - 1  # Mersenne prime
+max_uint32 = 2**32
+_MASK64 = 2**64 - 1
+
+
+def str_to_int32(s: str) -> int:
+    return int.from_bytes(hashlib.sha1(s.encode("utf-8")).digest()[:4], "little")
+
+
+def make_hash_params(num_minhashes: int, seed: int = 42) -> List[Tuple[int, int]]:
+    """Generate (a, b) parameters for `num_minhashes` hash functions."""
+    rng = random.Random(seed)
+    return [(rng.randint(1, max_uint32 - 1), rng.randint(0, max_uint32 - 1)) for _ in range(num_minhashes)]
+
+
+def create_minhash(shingle_hashes: Sequence[int], hash_params: Sequence[Tuple[int, int]]) -> List[int]:
+    """MinHash signature with one hash function per signature value.
+
+    Costs O(num_shingles * num_minhashes).
+    """
+    if len(shingle_hashes) == 0:
+        return [-1] * len(hash_params)
+    if isinstance(shingle_hashes, np.ndarray):
+        shingle_hashes = shingle_hashes.tolist()
+    sig = []
+    for a, b in hash_params:
+        m = min((((a * i + b) % p) % max_uint32) for i in shingle_hashes)
+        sig.append(m)
+    return sig
+
+
+@lru_cache(maxsize=None)
+def _oph_params(seed: int) -> Tuple[int, int, int, int]:
+    """Multiply-shift parameters for the shingle hash and the densification hash."""
+    rng = random.Random(seed)
+    return tuple(rng.getrandbits(64) | 1 for _ in range(4))
+
+
+_DENSIFY_PROBES = 32
+
+
+def _densify_probe(i: int, attempt: int, num_minhashes: int, a2: int, b2: int) -> int:
+    """Bin probed by empty bin `i` at the given attempt (identical for every post)."""
+    key = (i << 32) | attempt
+    return ((((a2 * key + b2) & _MASK64) >> 32) * num_minhashes) >> 32
+
+
+@lru_cache(maxsize=None)
+def _densify_table(num_minhashes: int, seed: int) -> np.ndarray:
+    """First `_DENSIFY_PROBES` probes of every bin, as a (num_minhashes, probes) array."""
+    _, _, a2, b2 = _oph_params(seed)
+    return np.array([[_densify_probe(i, attempt, num_minhashes, a2, b2) for attempt in range(_DENSIFY_PROBES)]
+                     for i in range(num_minhashes)], dtype=np.intp)
+
+
+def create_oph_minhash(shingle_hashes: Sequence[int], num_minhashes: int, seed: int = 42) -> List[int]:
+    """One-permutation MinHash signature with optimal densification.
+
+    Every shingle is hashed once to 32 bits and the hash space is split into
+    `num_minhashes` equal bins; each signature value is the minimum hash in its
+    bin. Empty bins borrow the value of a non-empty bin chosen by a hash of
+    (bin, attempt), which is the same for every post, so collisions still
+    estimate the Jaccard similarity (Shrivastava, "Optimal Densification for
+    Fast and Accurate Minwise Hashing", 2017).
+
+    Costs O(num_shingles + num_minhashes) and returns a list of ints, so the
+    signature can be used by the existing banding code.
+    """
+    if len(shingle_hashes) == 0:
+        return [-1] * num_minhashes
+    a, b, a2, b2 = _oph_params(seed)
+
+    x = np.asarray(shingle_hashes, dtype=np.uint64)
+    h = (x * np.uint64(a) + np.uint64(b)) >> np.uint64(32)  # wraps mod 2^64
+    bins = (h * np.uint64(num_minhashes)) >> np.uint64(32)
+
+    sig = np.full(num_minhashes, max_uint32, dtype=np.uint64)
+    np.minimum.at(sig, bins.astype(np.intp), h)
+
+    filled = sig != max_uint32
+    if filled.all():
+        return sig.tolist()
+
+    # Resolve most empty bins at once with the precomputed probe sequences
+    empty = np.flatnonzero(~filled)
+    probes = _densify_table(num_minhashes, seed)[empty]
+    hits = filled[probes]
+    first = hits.argmax(axis=1)
+    found = hits[np.arange(len(empty)), first]
+    sig[empty[found]] = sig[probes[found, first[found]]]
+
+    out = sig.tolist()
+    for i in empty[~found].tolist():
+        attempt = _DENSIFY_PROBES
+        while True:
+            j = _densify_probe(i, attempt, num_minhashes, a2, b2)
+            if filled[j]:
+                out[i] = out[j]
+                break
+            attempt += 1
+    return out
+
+
+def minhash_similarity(sig_a: Sequence[int], sig_b: Sequence[int]) -> float:
+    """Fraction of positions where two MinHash signatures agree."""
+    if len(sig_a) == 0:
+        return 0.0
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+
+def compare_schemes(posts: Sequence[Tuple[str, set]], num_minhashes: int, max_pairs_posts: int = 300,
+                    seed: int = 42) -> None:
+    """Print signature time and Jaccard estimation error of both MinHash schemes."""
+    from brute_force import jaccard
+
+    hashed = [[str_to_int32(s) for s in shingles] for _, shingles in posts]
+    hash_params = make_hash_params(num_minhashes, seed)
+
+    schemes = [
+        ("permutations", lambda hs: create_minhash(hs, hash_params)),
+        ("oph", lambda hs: create_oph_minhash(hs, num_minhashes, seed)),
+    ]
+    # All pairs of the first posts, so that the similar pairs are included
+    n = min(len(posts), max_pairs_posts)
+    pairs = [(i, j) for i in range(n) for j in range(i + 1, n)]
+    exact = np.array([jaccard(set(hashed[i]), set(hashed[j])) for i, j in pairs])
+    similar = exact > 0
+
+    for name, fn in schemes:
+        start = time.perf_counter()
+        sigs = [fn(hs) for hs in hashed]
+        elapsed = time.perf_counter() - start
+        errors = np.abs(np.array([minhash_similarity(sigs[i], sigs[j]) for i, j in pairs]) - exact)
+        print(f"{name:>12}, k = {num_minhashes:4d}: {len(posts) / elapsed:9.0f} posts/s, "
+              f"mean abs error = {errors.mean():.4f} (pairs with jaccard > 0: {errors[similar].mean():.4f}), "
+              f"max abs error = {errors.max():.4f}")
+
+
+def main(dataset: str, num_posts: int, sample_size: int = 1000):
+    from brute_force import sample_posts_from_file
+
+    print(f'Sampling {sample_size} posts from {dataset}')
+    sampled = sample_posts_from_file(dataset, num_posts, sample_size)
+    for k in (45, 90, 180, 360):
+        compare_schemes(sampled, k)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        print('Usage: python minhash.py input.txt num_posts [sample_size]')
+        sys.exit(1)
+    input_path = sys.argv[1]
+    num_posts = int(sys.argv[2])
+    sample_size = int(sys.argv[3]) if len(sys.argv) > 3 else 1000
+    main(input_path, num_posts, sample_size)
@@ -1,36 +1,68 @@
 from itertools import islice, chain
+from functools import lru_cache
+import hashlib
 import six
+import numpy as np
 from lxml import etree
 from html import unescape as _unescape
 import re
 import bleach
 from nltk.corpus import stopwords
+from dumps import open_dump
+from shingles import shingles_from_tokens  # no dependencies, also used by topic_drift
 
 
-# Efficient parsing of large XML files from
-# http://stackoverflow.com/a/9814580/987185
-def parse(fp):
-    """Efficiently parses an XML file from the StackExchange data dump and
-    returns a generator which yields one row at a time.
+class _RowTarget:
+    """lxml parser target that keeps the attributes of <row> elements.
+
+    No element tree is built, so there is nothing to clean up per row.
     """
 
-    context = etree.iterparse(fp, events=("end",))
+    def __init__(self, fields=None):
+        self.fields = fields
+        self.rows = []
+
+    def start(self, tag, attrib):
+        if tag == "row":
+            if self.fields is None:
+                self.rows.append(dict(attrib))
+            else:
+                self.rows.append({f: attrib[f] for f in self.fields if f in attrib})
+
+    def end(self, tag):
+        pass
+
+    def data(self, data):
+        pass
+
+    def close(self):
+        pass
+
 
-    for _, elem in context:
-        if elem.tag == "row":
-            # processing goes here
-            assert elem.text is None, "The row wasn't empty"
-            yield elem.attrib
+def parse(fp, fields=None, chunk_size=1 << 20):
+    """Efficiently parses an XML file from the StackExchange data dump and
+    returns a generator which yields one row (attributes dict) at a time.
 
-        # cleanup
-        # first empty children from current element
-        # This is not absolutely necessary if you are also deleting
-        # siblings, but it will allow you to free memory earlier.
-        elem.clear()
-        # second, delete previous siblings (records)
-        while elem.getprevious() is not None:
-            del elem.getparent()[0]
-        # make sure you have no references to Element objects outside the loop
+    `fp` is a binary file object or a path, which may be a compressed dump
+    (.7z/.bz2/.gz/.zst, see dumps.open_dump) that is decompressed while parsing.
+    With `fields`, e.g. ("Id", "Body"), only those attributes are kept.
+    """
+    stream = open_dump(fp) if isinstance(fp, str) else fp
+    target = _RowTarget(fields)
+    parser = etree.XMLParser(target=target, huge_tree=True)
+    try:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            parser.feed(chunk)
+            yield from target.rows
+            target.rows.clear()
+        parser.close()
+        yield from target.rows
+    finally:
+        if stream is not fp:
+            stream.close()
 
 
 def batch(iterable, size):
@@ -78,13 +110,69 @@ def remove_stopwords(tokens):
     return [t for t in tokens if t not in stop]
 
 
-def shingles_from_tokens(tokens, k=5):
-    """Return a set of k-word shingles."""
+_POLY_BASE = np.uint64(0x100000001B3)
+_POLY_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+@lru_cache(maxsize=1 << 20)
+def token_id(token):
+    """Intern a token to a 64-bit id (a hash, so ids agree between processes)."""
+    return int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def _window_hashes(ids, k, bits):
+    """Deduplicated polynomial hashes of every window of `k` ids, as a sorted uint64 array."""
+    if bits not in (32, 64):
+        raise ValueError('bits must be 32 or 64')
+    n = len(ids) - k + 1
+    if n <= 0:
+        return np.empty(0, dtype=np.uint64)
+    # Horner's rule for all windows at once, mod 2^64
+    h = np.zeros(n, dtype=np.uint64)
+    for j in range(k):
+        h = h * _POLY_BASE + ids[j:j + n]
+    h *= _POLY_MIX
+    if bits == 32:
+        h >>= np.uint64(32)
+    else:
+        h ^= h >> np.uint64(31)
+    return np.unique(h)
+
+
+def hashed_shingles_from_tokens(tokens, k=5, bits=32):
+    """Return the deduplicated `bits`-bit hashes of all k-word shingles as a NumPy array.
+
+    Tokens are interned to integer ids and every window is hashed with a
+    polynomial hash over the ids, so no shingle strings are built.
+    """
+    if k <= 0:
+        raise ValueError('k must be > 0')
+    ids = np.fromiter((token_id(t) for t in tokens), dtype=np.uint64, count=len(tokens))
+    return _window_hashes(ids, k, bits)
+
+
+def hashed_char_shingles(text, k=9, bits=32):
+    """Return the deduplicated `bits`-bit hashes of all character k-shingles of `text`."""
     if k <= 0:
         raise ValueError('k must be > 0')
-    if len(tokens) < k:
-        return set()
-    return set(' '.join(tokens[i:i + k]) for i in range(len(tokens) - k + 1))
+    ids = np.frombuffer(text.encode('utf-32-le'), dtype='<u4').astype(np.uint64)
+    return _window_hashes(ids, k, bits)
+
+
+def process_post_hashed(attrs, k=5, bits=32, chars=False):
+    """Given a row attributes dict, return (id, array of shingle hashes).
+
+    With `chars`, character k-shingles of the cleaned text are used instead of
+    k-word shingles.
+    """
+    pid, body = extract_id_and_body(attrs)
+    if pid is None:
+        return None, np.empty(0, dtype=np.uint64)
+    cleaned = clean_body_html(body)
+    if chars:
+        return pid, hashed_char_shingles(' '.join(tokenize_text(cleaned)), k=k, bits=bits)
+    tokens = remove_stopwords(tokenize_text(cleaned))
+    return pid, hashed_shingles_from_tokens(tokens, k=k, bits=bits)
 
 
 def process_post(attrs, k=5):
@@ -0,0 +1,7 @@
+def shingles_from_tokens(tokens, k=5):
+    """Return a set of k-word shingles."""
+    if k <= 0:
+        raise ValueError('k must be > 0')
+    if len(tokens) < k:
+        return set()
+    return set(' '.join(tokens[i:i + k]) for i in range(len(tokens) - k + 1))
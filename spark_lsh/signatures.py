@@ -0,0 +1,150 @@
+import sys
+import pickle
+import struct
+from typing import Sequence, Tuple
+import numpy as np
+
+# Packed signature layout: 3 byte header (b_bits: uint8, k: uint16) followed by
+# the low `b_bits` bits of the k signature values. Values of 8, 16 and 32 bits
+# are stored as little endian uint8/uint16/uint32, smaller widths are packed
+# several values per byte.
+_HEADER = struct.Struct("<BH")
+_DTYPES = {8: "<u1", 16: "<u2", 32: "<u4"}
+B_BITS = (1, 2, 4, 8, 16, 32)
+
+_BAND_BASE = np.uint64(0x100000001B3)
+_BAND_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+def pack_signature(sig: Sequence[int], b_bits: int = 32) -> bytes:
+    """Pack a MinHash signature into bytes, keeping only the low `b_bits` of every value.
+
+    b_bits = 32 keeps the full values (e.g. the band hashes of `pack_lsh_record`),
+    a lower b_bits only reduces the signature for similarity estimation.
+    """
+    if b_bits not in B_BITS:
+        raise ValueError(f'b_bits must be one of {B_BITS}')
+    values = np.asarray(sig, dtype=np.int64).astype(np.uint64) & np.uint64((1 << b_bits) - 1)
+    header = _HEADER.pack(b_bits, len(values))
+    if b_bits >= 8:
+        return header + values.astype(_DTYPES[b_bits]).tobytes()
+
+    per_byte = 8 // b_bits
+    padded = np.zeros(-(-len(values) // per_byte) * per_byte, dtype=np.uint8)
+    padded[:len(values)] = values
+    shifts = np.arange(per_byte, dtype=np.uint8) * b_bits
+    packed = np.bitwise_or.reduce(padded.reshape(-1, per_byte) << shifts, axis=1).astype(np.uint8)
+    return header + packed.tobytes()
+
+
+def unpack_signature(buf: bytes) -> np.ndarray:
+    """Return the signature values of a packed signature as a uint32 array."""
+    b_bits, k = _HEADER.unpack_from(buf)
+    body = np.frombuffer(buf, dtype=_DTYPES.get(b_bits, np.uint8), offset=_HEADER.size)
+    if b_bits >= 8:
+        return body.astype(np.uint32)
+
+    per_byte = 8 // b_bits
+    shifts = np.arange(per_byte, dtype=np.uint8) * b_bits
+    values = (body[:, None] >> shifts) & np.uint8((1 << b_bits) - 1)
+    return values.reshape(-1)[:k].astype(np.uint32)
+
+
+def _packed_size(b_bits: int, k: int) -> int:
+    if b_bits >= 8:
+        return k * b_bits // 8
+    return -(-k // (8 // b_bits))
+
+
+def reduce_signature(buf: bytes, b_bits: int) -> bytes:
+    """Repack a packed signature with fewer bits per value."""
+    return pack_signature(unpack_signature(buf), b_bits)
+
+
+def estimate_similarity(buf_a: bytes, buf_b: bytes) -> float:
+    """Estimate the Jaccard similarity of two packed signatures with the same b_bits.
+
+    With b-bit values two different minima still agree with probability about
+    1 / 2^b, so the raw agreement P is corrected to (P - 1/2^b) / (1 - 1/2^b)
+    (Li and König, "b-Bit Minwise Hashing", 2010, for sparse sets).
+    """
+    b_bits, k = _HEADER.unpack_from(buf_a)
+    if b_bits >= 8:
+        dtype = _DTYPES[b_bits]
+        agree = np.count_nonzero(np.frombuffer(buf_a, dtype=dtype, offset=_HEADER.size)
+                                 == np.frombuffer(buf_b, dtype=dtype, offset=_HEADER.size))
+    else:
+        agree = np.count_nonzero(unpack_signature(buf_a) == unpack_signature(buf_b))
+    p = agree / k
+    if b_bits == 32:
+        return p
+    chance = 1.0 / (1 << b_bits)
+    return min(max((p - chance) / (1.0 - chance), 0.0), 1.0)
+
+
+def band_hashes(sig: Sequence[int], bands: int, rows: int) -> np.ndarray:
+    """32-bit bucket hash of every band of `rows` signature values, as a uint32 array."""
+    values = np.asarray(sig, dtype=np.int64).astype(np.uint64)[:bands * rows].reshape(bands, rows)
+    h = np.zeros(bands, dtype=np.uint64)
+    for j in range(rows):
+        h = h * _BAND_BASE + values[:, j]
+    h *= _BAND_MIX
+    return (h >> np.uint64(32)).astype(np.uint32)
+
+
+def pack_lsh_record(sig: Sequence[int], bands: int, rows: int, b_bits: int = 8) -> bytes:
+    """Pack what the LSH pipeline needs of a signature: the band bucket hashes and a b-bit signature.
+
+    The band hashes (packed uint32) are computed once here, so the full
+    32-bit signature does not have to be kept; the `b_bits` signature is only
+    used for similarity estimation.
+    """
+    return pack_signature(band_hashes(sig, bands, rows), 32) + pack_signature(sig, b_bits)
+
+
+def split_lsh_record(buf: bytes) -> Tuple[bytes, bytes]:
+    """Return the packed band hashes and the packed b-bit signature of an LSH record."""
+    b_bits, k = _HEADER.unpack_from(buf)
+    end = _HEADER.size + _packed_size(b_bits, k)
+    return buf[:end], buf[end:]
+
+
+def record_bands(buf: bytes) -> np.ndarray:
+    """Band bucket hashes of an LSH record."""
+    return unpack_signature(split_lsh_record(buf)[0])
+
+
+def record_signature(buf: bytes) -> bytes:
+    """Packed b-bit signature of an LSH record, for `estimate_similarity`."""
+    return split_lsh_record(buf)[1]
+
+
+def size_report(sigs: Sequence[Sequence[int]], bands: int, rows: int) -> None:
+    """Print the pickled size per (id, value) record for signatures as lists, packed and as LSH records.
+
+    Records are pickled in one batch, the way PySpark caches and shuffles them.
+    """
+    def per_record(values):
+        batch = list(enumerate(values))
+        return len(pickle.dumps(batch, protocol=pickle.HIGHEST_PROTOCOL)) / len(batch)
+
+    baseline = per_record([list(sig) for sig in sigs])
+    print(f"{'list':>14}: {baseline:6.1f} bytes per record")
+    for b_bits in (32, 8):
+        size = per_record([pack_signature(sig, b_bits) for sig in sigs])
+        print(f"{str(b_bits) + '-bit':>14}: {size:6.1f} bytes per record ({baseline / size:.1f}x smaller)")
+    for b_bits in (8, 4, 2):
+        size = per_record([pack_lsh_record(sig, bands, rows, b_bits) for sig in sigs])
+        print(f"{'bands + ' + str(b_bits) + '-bit':>14}: {size:6.1f} bytes per record ({baseline / size:.1f}x smaller)")
+
+
+if __name__ == '__main__':
+    import random
+    from minhash import make_hash_params, create_minhash
+
+    bands = int(sys.argv[1]) if len(sys.argv) > 1 else 15
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    hash_params = make_hash_params(bands * rows)
+    rng = random.Random(0)
+    sigs = [create_minhash([rng.getrandbits(32) for _ in range(50)], hash_params) for _ in range(1000)]
+    size_report(sigs, bands, rows)
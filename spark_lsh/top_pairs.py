@@ -0,0 +1,58 @@
+import heapq
+from typing import Hashable, Iterable, List, Tuple
+
+Scored = Tuple[float, Hashable]
+
+
+def push_bounded(heap: List[Scored], item: Scored, k: int) -> List[Scored]:
+    """Push `item` on a min-heap that keeps only the `k` largest items."""
+    if len(heap) < k:
+        heapq.heappush(heap, item)
+    elif item > heap[0]:
+        heapq.heappushpop(heap, item)
+    return heap
+
+
+def merge_bounded(a: List[Scored], b: List[Scored], k: int) -> List[Scored]:
+    """Merge two bounded heaps into one holding the `k` largest items."""
+    if len(a) < len(b):
+        a, b = b, a
+    for item in b:
+        push_bounded(a, item, k)
+    return a
+
+
+def top_k_of_partition(items: Iterable[Scored], k: int) -> Iterable[List[Scored]]:
+    """Return the `k` largest items of one partition as a single heap."""
+    heap: List[Scored] = []
+    for item in items:
+        push_bounded(heap, item, k)
+    yield heap
+
+
+def top_k_pairs(pair_scores, k: int, depth: int = 2) -> List[Tuple[float, Tuple[int, int]]]:
+    """Return the `k` highest scoring pairs as [(score, (i, j)), ...], best first.
+
+    `pair_scores` is an RDD of ((i, j), score), e.g. `pair_counts`. Each partition
+    keeps a heap of at most `k` pairs and the heaps are merged with a tree-reduce,
+    so only one pass over the data is needed and nothing is sorted globally.
+    """
+    heap = (pair_scores
+            .map(lambda kv: (kv[1], kv[0]))
+            .mapPartitions(lambda it: top_k_of_partition(it, k))
+            .treeReduce(lambda a, b: merge_bounded(a, b, k), depth=depth))
+    return sorted(heap, reverse=True)
+
+
+def top_n_neighbours(pair_scores, n: int):
+    """Return an RDD of (post_id, [(score, other_id), ...]) with the `n` most similar posts per post.
+
+    Every pair is emitted for both of its posts and folded into a bounded heap per
+    post with `aggregateByKey`, which combines map-side and never sorts the shuffle.
+    """
+    return (pair_scores
+            .flatMap(lambda kv: ((kv[0][0], (kv[1], kv[0][1])), (kv[0][1], (kv[1], kv[0][0]))))
+            .aggregateByKey([],
+                            lambda heap, item: push_bounded(heap, item, n),
+                            lambda a, b: merge_bounded(a, b, n))
+            .mapValues(lambda heap: sorted(heap, reverse=True)))
@@ -0,0 +1,113 @@
+import os
+import sys
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+# Reuse the shingling, MinHash and banding code of the LSH project (these modules only need numpy)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "spark_lsh"))
+from shingles import shingles_from_tokens  # noqa: E402
+from brute_force import jaccard  # noqa: E402
+from lsh_evaluate import local_signatures, local_candidate_pairs  # noqa: E402
+
+
+def title_shingles(tokens: Sequence[str], k: int = 2) -> set:
+    """k-word shingles of a normalized title; titles shorter than k are one shingle."""
+    shingles = shingles_from_tokens(list(tokens), k)
+    if not shingles and tokens:
+        shingles = {" ".join(tokens)}
+    return shingles
+
+
+def _find(parent: np.ndarray, i: int) -> int:
+    root = i
+    while parent[root] != root:
+        root = parent[root]
+    while parent[i] != root:  # path compression
+        parent[i], i = root, parent[i]
+    return root
+
+
+def _union(parent: np.ndarray, a: int, b: int) -> None:
+    a, b = _find(parent, a), _find(parent, b)
+    if a != b:
+        # The earliest document of a group is its representative
+        parent[max(a, b)] = min(a, b)
+
+
+def near_duplicate_groups(token_lists: Sequence[Sequence[str]], threshold: float = 0.8, k: int = 2,
+                          num_minhashes: int = 64, bands: int = 16, rows: int = 4, groups: Sequence = None,
+                          scheme: str = "oph", seed: int = 42) -> np.ndarray:
+    """Representative (first document) of the near-duplicate group of every title.
+
+    Identical token lists are merged directly. The remaining distinct titles
+    are MinHashed and banded into candidate pairs like in `spark_lsh`, and
+    candidates with an exact Jaccard similarity of their shingles >= `threshold`
+    are merged with union-find. With `groups` (e.g. the years) only documents
+    of the same group are merged. Empty titles are never merged.
+    """
+    n = len(token_lists)
+    groups = np.zeros(n, dtype=int) if groups is None else np.asarray(groups)
+    parent = np.arange(n)
+
+    # Exact duplicates first, so every distinct title is MinHashed once
+    first = {}
+    for i, tokens in enumerate(token_lists):
+        if not tokens:
+            continue
+        key = (groups[i], tuple(tokens))
+        if key in first:
+            parent[i] = first[key]
+        else:
+            first[key] = i
+
+    distinct = list(first.values())
+    posts = [(i, title_shingles(token_lists[i], k)) for i in distinct]
+    shingles = dict(posts)
+    sigs = local_signatures(posts, num_minhashes, scheme, seed)
+    for a, b in local_candidate_pairs(sigs, bands, rows):
+        if groups[a] == groups[b] and jaccard(shingles[a], shingles[b]) >= threshold:
+            _union(parent, a, b)
+
+    return np.array([_find(parent, i) for i in range(n)])
+
+
+def deduplicate(token_lists: Sequence[Sequence[str]], **kwargs) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Collapse near-duplicate titles into one weighted representative.
+
+    Takes the same keyword arguments as `near_duplicate_groups`. Returns the
+    indices of the representatives, their weights (group sizes, usable as
+    `sample_weight`) and, for every document, the position of its
+    representative in the first array.
+    """
+    representative = near_duplicate_groups(token_lists, **kwargs)
+    keep, position, weights = np.unique(representative, return_inverse=True, return_counts=True)
+    return keep, weights, position
+
+
+def duplicate_examples(titles: Sequence[str], representative: np.ndarray, n: int = 10) -> List[List[str]]:
+    """Titles of the `n` largest near-duplicate groups, to check the threshold."""
+    roots, counts = np.unique(representative, return_counts=True)
+    order = np.argsort(counts, kind="stable")[::-1][:n]
+    return [[titles[i] for i in np.flatnonzero(representative == roots[j])] for j in order if counts[j] > 1]
+
+
+def main(path: str, threshold: float = 0.8):
+    from loader import load_publications
+    from preprocessing import normalize_titles, DOMAIN_STOPS
+
+    table = load_publications(path)
+    titles = table["title"].to_list()
+    tokens = normalize_titles(titles, method="lemma", pos="v", extra_stopwords=DOMAIN_STOPS)
+    representative = near_duplicate_groups(tokens, threshold=threshold, groups=table["year"].to_numpy())
+    keep = np.unique(representative)
+    print(f"{len(titles)} titles -> {len(keep)} representatives (threshold {threshold})")
+    for group in duplicate_examples(titles, representative, 5):
+        print(" |", "\n | ".join(group[:3]), "\n")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python dedup.py <publications.txt> [threshold]")
+        sys.exit(1)
+    main(sys.argv[1], float(sys.argv[2]) if len(sys.argv) > 2 else 0.8)
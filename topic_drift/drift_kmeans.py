@@ -0,0 +1,156 @@
+import pickle
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.cluster import MiniBatchKMeans
+
+from loader import to_year, valid_years
+
+
+class YearlyKMeansDrift:
+    """Topic drift with MiniBatchKMeans, processing one year at a time.
+
+    Every year starts from the centroids of the previous year and updates
+    them with `partial_fit` on that year's documents only. The previous
+    centroids are added to every mini-batch of every pass as `anchor_weight`
+    weighted samples, so clusters without documents in a year stay where they
+    were (and years with fewer documents than clusters can still be
+    processed); a lower `anchor_weight` lets the centroids follow the new
+    year more closely.
+
+    A cluster is born when its size in a year reaches `min_size` and dies when
+    it drops below it. A centroid that moves more than `birth_movement` in one
+    year now describes another topic, so that counts as both a death and a birth.
+
+    All years must use the same feature space, e.g. a TfidfVectorizer fitted
+    once and `transform`ed per year.
+    """
+
+    def __init__(self, n_clusters: int, vocab: Sequence[str] = None, batch_size: int = 1024,
+                 passes: int = 3, anchor_weight: float = 1.0, min_size: int = 5,
+                 birth_movement: float = 0.5, n_terms: int = 10, random_state: int = 0):
+        self.n_clusters = n_clusters
+        self.vocab = vocab
+        self.batch_size = batch_size
+        self.passes = passes
+        self.anchor_weight = anchor_weight
+        self.min_size = min_size
+        self.birth_movement = birth_movement
+        self.n_terms = n_terms
+        self.random_state = random_state
+
+        self.centers: Optional[np.ndarray] = None
+        self.centers_per_year = {}
+        self.sizes_per_year = {}
+        self.stats: List[dict] = []
+        self._last_year = None
+        self._pending = []  # years seen before there were enough documents to initialize
+
+    def _top_terms(self, centers: np.ndarray) -> List[str]:
+        order = np.argsort(centers, axis=1)[:, ::-1][:, :self.n_terms]
+        if self.vocab is None:
+            return [" ".join(str(i) for i in row) for row in order]
+        return [" ".join(self.vocab[i] for i in row) for row in order]
+
+    def _fit_year(self, X: sp.csr_matrix, rng: np.random.RandomState) -> None:
+        model = MiniBatchKMeans(n_clusters=self.n_clusters, init=self.centers, n_init=1,
+                                batch_size=self.batch_size, random_state=self.random_state)
+        anchors = sp.csr_matrix(self.centers)
+        for _ in range(self.passes):
+            order = rng.permutation(X.shape[0])
+            for start in range(0, max(len(order), 1), self.batch_size):
+                batch = X[order[start:start + self.batch_size]]
+                # Anchor every batch, the first partial_fit call needs >= n_clusters samples
+                batch = sp.vstack([batch, anchors], format="csr")
+                weights = np.ones(batch.shape[0])
+                weights[-self.n_clusters:] = self.anchor_weight
+                model.partial_fit(batch, sample_weight=weights)
+        self.centers = model.cluster_centers_
+
+    def _record(self, year, X: sp.csr_matrix, previous: Optional[np.ndarray]) -> None:
+        labels = self._assign(X)
+        sizes = np.bincount(labels, minlength=self.n_clusters)
+        prev_sizes = self.sizes_per_year.get(self._last_year) if self._last_year is not None else None
+        movement = (np.linalg.norm(self.centers - previous, axis=1) if previous is not None
+                    else np.full(self.n_clusters, np.nan))
+        alive = sizes >= self.min_size
+        was_alive = prev_sizes >= self.min_size if prev_sizes is not None else np.zeros(self.n_clusters, bool)
+        replaced = movement > self.birth_movement  # False for NaN
+        terms = self._top_terms(self.centers)
+
+        for c in range(self.n_clusters):
+            self.stats.append({
+                "year": year,
+                "cluster": c,
+                "size": int(sizes[c]),
+                "movement": float(movement[c]),
+                "born": bool(alive[c] and (not was_alive[c] or replaced[c])),
+                "died": bool(was_alive[c] and (not alive[c] or replaced[c])),
+                "top_terms": terms[c],
+            })
+        self.centers_per_year[year] = self.centers.copy()
+        self.sizes_per_year[year] = sizes
+        self._last_year = year
+
+    def _assign(self, X: sp.csr_matrix) -> np.ndarray:
+        if X.shape[0] == 0:
+            return np.zeros(0, dtype=int)
+        # Squared distances up to a per-row constant: -2 x.c + |c|^2
+        dist = -2 * np.asarray(X @ self.centers.T) + (self.centers ** 2).sum(axis=1)
+        return dist.argmin(axis=1)
+
+    def add_year(self, year, X) -> "YearlyKMeansDrift":
+        """Update the clustering with the documents of the next (later) year."""
+        X = sp.csr_matrix(X)
+        if to_year(year) is None:
+            raise ValueError(f'year is missing ({year!r})')
+        year = to_year(year)
+        if self._last_year is not None and year <= self._last_year:
+            raise ValueError(f'year {year} is not after the last processed year {self._last_year}')
+
+        if self.centers is None:
+            self._pending.append((year, X))
+            total = sum(x.shape[0] for _, x in self._pending)
+            if total < self.n_clusters:
+                return self
+            # Initialize with k-means++ on all documents seen so far
+            init = MiniBatchKMeans(n_clusters=self.n_clusters, batch_size=self.batch_size, n_init=3,
+                                   random_state=self.random_state)
+            init.fit(sp.vstack([x for _, x in self._pending], format="csr"))
+            self.centers = init.cluster_centers_
+            for pending_year, x in self._pending:
+                self._record(pending_year, x, None)
+            self._pending = []
+            return self
+
+        previous = self.centers.copy()
+        self._fit_year(X, np.random.RandomState(self.random_state + len(self.centers_per_year)))
+        self._record(year, X, previous)
+        return self
+
+    def fit(self, X, years: Sequence[int]) -> "YearlyKMeansDrift":
+        """Process all years of a document matrix in chronological order (documents without a year are skipped)."""
+        mask, years = valid_years(years)
+        X = sp.csr_matrix(X)[np.flatnonzero(mask)]
+        for year in np.unique(years):
+            self.add_year(int(year), X[np.flatnonzero(years == year)])
+        return self
+
+    def predict(self, X) -> np.ndarray:
+        """Cluster of every document with the current centroids."""
+        return self._assign(sp.csr_matrix(X))
+
+    def stats_frame(self) -> pd.DataFrame:
+        """Per year and cluster: size, centroid movement, births, deaths and top terms."""
+        return pd.DataFrame(self.stats)
+
+    def save(self, path: str) -> None:
+        with open(path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path: str) -> "YearlyKMeansDrift":
+        with open(path, "rb") as f:
+            return pickle.load(f)
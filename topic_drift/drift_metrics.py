@@ -0,0 +1,98 @@
+import os
+from typing import Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from loader import valid_years
+
+
+def one_hot(codes: np.ndarray, n: int) -> sp.csr_matrix:
+    """(documents x n) indicator matrix of integer codes."""
+    return sp.csr_matrix((np.ones(len(codes)), (np.arange(len(codes)), codes)), shape=(len(codes), n))
+
+
+def year_topic_codes(years: Sequence[int], topics: Sequence[int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Sorted distinct years and topics, and the (year, topic) cell of every document.
+
+    All years must be present, see `valid_years`.
+    """
+    year_values, year_idx = np.unique(np.asarray(years), return_inverse=True)
+    topic_values, topic_idx = np.unique(np.asarray(topics), return_inverse=True)
+    return year_values, topic_values, year_idx * len(topic_values) + topic_idx
+
+
+def js_divergence(P: sp.csr_matrix, Q: sp.csr_matrix) -> np.ndarray:
+    """Jensen-Shannon divergence (base 2, in [0, 1]) between corresponding rows of two
+    row-stochastic sparse matrices."""
+    M = ((P + Q) / 2).tocsr()
+    inv_m = M.power(-1)
+
+    def kl_to_m(A):
+        ratio = A.multiply(inv_m).tocsr()  # only where A > 0, so M > 0 as well
+        ratio.data = np.log2(ratio.data)
+        return np.asarray(A.multiply(ratio).sum(axis=1)).ravel()
+
+    return (kl_to_m(P) + kl_to_m(Q)) / 2
+
+
+def _row_normalize(A: sp.csr_matrix) -> sp.csr_matrix:
+    totals = np.asarray(A.sum(axis=1)).ravel()
+    with np.errstate(divide="ignore"):
+        scale = np.where(totals > 0, 1 / totals, 0)
+    return sp.diags(scale) @ A
+
+
+def drift_table(X, years: Sequence[int], topics: Sequence[int]) -> pd.DataFrame:
+    """Per year and topic: document count, prevalence, centroid shift and term churn.
+
+    `X` is a (documents x terms) matrix such as a TF-IDF or count matrix. All
+    per-cell sums come from a single product of a one-hot (year, topic) matrix
+    with `X`, so recomputing after new topic assignments is a few sparse
+    operations. Prevalence is the share of the year's documents in the topic,
+    centroid shift the euclidean distance between the topic's mean document
+    vector and that of the previous year, and term churn the Jensen-Shannon
+    divergence between the topic's term distributions of both years. Shift and
+    churn are NaN when the topic has no documents in either year. Documents
+    without a year are left out.
+    """
+    mask, years = valid_years(years)
+    X = sp.csr_matrix(X)[np.flatnonzero(mask)]
+    topics = np.asarray(topics)[mask]
+    year_values, topic_values, cells = year_topic_codes(years, topics)
+    n_years, n_topics = len(year_values), len(topic_values)
+
+    H = one_hot(cells, n_years * n_topics)
+    counts = np.asarray(H.sum(axis=0)).ravel()                # documents per cell
+    term_sums = (H.T @ X).tocsr()                             # (year, topic) x terms
+    per_year = counts.reshape(n_years, n_topics).sum(axis=1)
+
+    centroids = (sp.diags(1 / np.maximum(counts, 1)) @ term_sums).tocsr()
+    distributions = _row_normalize(term_sums).tocsr()
+
+    # Row of the same topic in the previous year, for every cell after the first year
+    current = np.arange(n_topics, n_years * n_topics)
+    previous = current - n_topics
+    diff = (centroids[current] - centroids[previous]).tocsr()
+    shift = np.sqrt(np.asarray(diff.multiply(diff).sum(axis=1)).ravel())
+    churn = js_divergence(distributions[current], distributions[previous])
+    missing = (counts[current] == 0) | (counts[previous] == 0)
+    shift[missing] = np.nan
+    churn[missing] = np.nan
+
+    nan_first_year = np.full(n_topics, np.nan)
+    return pd.DataFrame({
+        "year": np.repeat(year_values, n_topics).astype(np.int32),
+        "topic": np.tile(topic_values, n_years),
+        "count": counts.astype(np.int32),
+        "prevalence": (counts / np.repeat(np.maximum(per_year, 1), n_topics)).astype(np.float32),
+        "centroid_shift": np.concatenate([nan_first_year, shift]).astype(np.float32),
+        "js_divergence": np.concatenate([nan_first_year, churn]).astype(np.float32),
+    })
+
+
+def write_drift_table(table: pd.DataFrame, path: str = "data/cache/drift.parquet") -> None:
+    """Write a drift table as a (zstd compressed) Parquet file."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    table.to_parquet(path, index=False, compression="zstd")
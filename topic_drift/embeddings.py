@@ -0,0 +1,86 @@
+import hashlib
+import os
+import re
+from typing import Callable, List, Sequence
+
+import numpy as np
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"  # BERTopic's default embedding model
+
+
+def title_keys(titles: Sequence[str]) -> np.ndarray:
+    """16-byte hash of every title, used to find its row in the cache."""
+    return np.array([hashlib.blake2b(t.encode("utf-8"), digest_size=16).digest() for t in titles], dtype="S16")
+
+
+def sentence_transformer_encoder(model_name: str = DEFAULT_MODEL, batch_size: int = 256,
+                                 threads: int = None) -> Callable[[List[str]], np.ndarray]:
+    """Encoder that embeds titles in large batches with sentence-transformers on the CPU."""
+    def encode(titles: List[str]) -> np.ndarray:
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if threads:
+            torch.set_num_threads(threads)
+        model = SentenceTransformer(model_name, device="cpu")
+        return model.encode(titles, batch_size=batch_size, show_progress_bar=True, convert_to_numpy=True)
+    return encode
+
+
+def _paths(cache_dir: str, model_name: str, dtype: str):
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+    base = os.path.join(cache_dir, f"{slug}.{np.dtype(dtype).name}")
+    return base + ".npy", base + ".keys.npy"
+
+
+def embed_titles(titles: Sequence[str], model_name: str = DEFAULT_MODEL, batch_size: int = 256,
+                 threads: int = None, dtype: str = "float16", cache_dir: str = "data/cache/embeddings",
+                 encode: Callable[[List[str]], np.ndarray] = None) -> np.ndarray:
+    """Return the embedding of every title, encoding only titles that are not cached yet.
+
+    Vectors are stored per model in a memory-mapped `dtype` .npy file with the
+    title hashes in a separate keys file. New titles are encoded in batches of
+    `batch_size` and appended. The result (float32, one row per title) can be
+    passed to `BERTopic.fit_transform(titles, embeddings=...)`.
+    """
+    vectors_path, keys_path = _paths(cache_dir, model_name, dtype)
+    keys = title_keys(titles)
+
+    cached_keys = np.load(keys_path) if os.path.exists(keys_path) else np.empty(0, dtype="S16")
+    vectors = np.load(vectors_path, mmap_mode="r") if len(cached_keys) else None
+    row_of = {k: i for i, k in enumerate(cached_keys.tolist())}
+
+    missing = {}
+    for title, key in zip(titles, keys.tolist()):
+        if key not in row_of and key not in missing:
+            missing[key] = title
+
+    if missing:
+        encode = encode or sentence_transformer_encoder(model_name, batch_size, threads)
+        new_vectors = np.asarray(encode(list(missing.values())))
+        n_old = len(cached_keys)
+        dim = new_vectors.shape[1]
+
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = vectors_path + ".tmp.npy"
+        out = np.lib.format.open_memmap(tmp, mode="w+", dtype=dtype, shape=(n_old + len(missing), dim))
+        for start in range(0, n_old, 100_000):
+            end = min(start + 100_000, n_old)
+            out[start:end] = vectors[start:end]
+        out[n_old:] = new_vectors
+        out.flush()
+        del out, vectors
+        os.replace(tmp, vectors_path)
+
+        new_keys = np.array(list(missing.keys()), dtype="S16")
+        np.save(keys_path + ".tmp.npy", np.concatenate([cached_keys, new_keys]))
+        os.replace(keys_path + ".tmp.npy", keys_path)
+
+        row_of.update((k, n_old + i) for i, k in enumerate(missing.keys()))
+        vectors = np.load(vectors_path, mmap_mode="r")
+
+    if vectors is None:
+        # No titles and nothing cached yet: the dimension is unknown without loading the model
+        return np.empty((0, 0), dtype=np.float32)
+    rows = np.fromiter((row_of[k] for k in keys.tolist()), dtype=np.int64, count=len(keys))
+    return np.asarray(vectors[rows], dtype=np.float32)
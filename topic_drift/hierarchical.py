@@ -0,0 +1,74 @@
+from typing import Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.cluster import AgglomerativeClustering
+from sklearn.decomposition import TruncatedSVD
+from sklearn.neighbors import kneighbors_graph
+from sklearn.preprocessing import normalize
+
+
+def reduce_svd(X, n_components: int = 100, seed: int = 0) -> Tuple[np.ndarray, TruncatedSVD]:
+    """Reduce a sparse TF-IDF matrix with TruncatedSVD (LSA) and L2-normalize the rows.
+
+    On normalized rows euclidean distance is a monotone function of cosine
+    distance, so Ward linkage on the result groups by cosine similarity.
+    """
+    svd = TruncatedSVD(n_components=n_components, random_state=seed)
+    Z = normalize(svd.fit_transform(X))
+    return Z, svd
+
+
+def knn_graph(Z: np.ndarray, n_neighbors: int = 15, approximate: bool = True, seed: int = 0) -> sp.csr_matrix:
+    """Symmetric k-nearest-neighbour connectivity graph of the rows of `Z`.
+
+    Uses NN-descent (pynndescent) when it is installed and `approximate` is
+    set, otherwise an exact search on the (low-dimensional) rows.
+    """
+    n = Z.shape[0]
+    graph = None
+    if approximate:
+        try:
+            from pynndescent import NNDescent
+        except ImportError:
+            NNDescent = None
+        if NNDescent is not None:
+            neighbors, _ = NNDescent(Z, n_neighbors=n_neighbors + 1, random_state=seed).neighbor_graph
+            rows = np.repeat(np.arange(n), n_neighbors)
+            cols = neighbors[:, 1:].ravel()  # the first neighbour is the point itself
+            graph = sp.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(n, n))
+    if graph is None:
+        graph = kneighbors_graph(Z, n_neighbors=n_neighbors, include_self=False)
+    return graph.maximum(graph.T).tocsr()
+
+
+def hierarchical_clusters(X, n_clusters: int = None, distance_threshold: float = None,
+                          n_components: int = 100, n_neighbors: int = 15, linkage: str = "ward",
+                          seed: int = 0) -> Tuple[AgglomerativeClustering, np.ndarray]:
+    """Agglomerative clustering of a sparse TF-IDF matrix without densifying it.
+
+    The matrix is reduced with TruncatedSVD, and only clusters that are
+    connected in a kNN graph of the reduced rows are merged, which keeps the
+    memory use linear in the number of documents. The full tree is computed,
+    so `linkage_matrix` can be used for a dendrogram.
+
+    Returns the fitted model and the reduced matrix.
+    """
+    Z, _ = reduce_svd(X, n_components, seed)
+    connectivity = knn_graph(Z, n_neighbors, seed=seed)
+    model = AgglomerativeClustering(n_clusters=n_clusters, distance_threshold=distance_threshold,
+                                    connectivity=connectivity, linkage=linkage,
+                                    compute_full_tree=True, compute_distances=True)
+    model.fit(Z)
+    return model, Z
+
+
+def linkage_matrix(model: AgglomerativeClustering) -> np.ndarray:
+    """Convert a fitted AgglomerativeClustering tree to a scipy linkage matrix."""
+    n = len(model.labels_)
+    counts = np.zeros(model.children_.shape[0])
+    for i, (a, b) in enumerate(model.children_):
+        counts[i] = (1 if a < n else counts[a - n]) + (1 if b < n else counts[b - n])
+    # Connectivity constraints can make merge distances non-monotonic, which dendrogram can't draw
+    distances = np.maximum.accumulate(model.distances_)
+    return np.column_stack([model.children_, distances, counts]).astype(float)
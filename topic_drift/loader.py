@@ -0,0 +1,112 @@
+import ast
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+
+def to_year(value) -> Optional[int]:
+    """Year as an int, or None when it is missing (None, NaN after to_pandas(), pd.NA)."""
+    if pd.isna(value):
+        return None
+    return int(value)
+
+
+def valid_years(years: Sequence) -> Tuple[np.ndarray, np.ndarray]:
+    """Mask of the documents that have a year, and those years as int64."""
+    years = np.asarray(years)
+    mask = ~pd.isna(years)
+    return mask, years[mask].astype(np.int64)
+
+
+def _parse_lines(lines: Sequence[str]) -> List[dict]:
+    """Parse records, using the JSON parser where possible and literal_eval otherwise."""
+    records = []
+    use_json = True
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if use_json:
+            try:
+                records.append(json.loads(line))
+                continue
+            except ValueError:
+                # Python literals (single quotes, None, ...): don't try JSON again in this chunk
+                use_json = False
+        records.append(ast.literal_eval(line))
+    return records
+
+
+def _to_columns(records: List[dict]) -> Dict[str, list]:
+    columns: Dict[str, list] = {}
+    for n, record in enumerate(records):
+        for key in record:
+            if key not in columns:
+                columns[key] = [None] * n
+        for key, values in columns.items():
+            values.append(record.get(key))
+    return columns
+
+
+def parse_publications(path: str, workers: int = None, chunk_size: int = 50_000) -> pa.Table:
+    """Parse the publications file into an Arrow table with typed `title` and `year` columns."""
+    with open(path, "r") as f:
+        lines = f.readlines()
+    chunks = [lines[i:i + chunk_size] for i in range(0, len(lines), chunk_size)]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(chunks) <= 1:
+        records = [r for chunk in map(_parse_lines, chunks) for r in chunk]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            records = [r for chunk in pool.map(_parse_lines, chunks) for r in chunk]
+
+    columns = _to_columns(records)
+    arrays = {}
+    for name, values in columns.items():
+        if name == "title":
+            arrays[name] = pa.array(values, type=pa.string())
+        elif name == "year":
+            arrays[name] = pa.array([None if v is None else int(v) for v in values], type=pa.int32())
+        else:
+            try:
+                arrays[name] = pa.array(values)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                arrays[name] = pa.array([None if v is None else str(v) for v in values], type=pa.string())
+    return pa.table(arrays)
+
+
+def _cache_path(path: str, cache_dir: str) -> str:
+    stat = os.stat(path)
+    key = f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f"{name}_{hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]}.arrow")
+
+
+def load_table(path: str = "data/data_mining_publications.txt", columns: Sequence[str] = None,
+               cache_dir: str = "data/cache") -> pa.Table:
+    """Load the publications as an Arrow table, memory-mapped from the columnar cache.
+
+    The text file is parsed only once; the table is stored as an uncompressed
+    Arrow IPC (Feather v2) file keyed on the path, size and modification time.
+    """
+    cache = _cache_path(path, cache_dir)
+    if not os.path.exists(cache):
+        table = parse_publications(path)
+        os.makedirs(cache_dir, exist_ok=True)
+        feather.write_feather(table, cache + ".tmp", compression="uncompressed")
+        os.replace(cache + ".tmp", cache)
+    return feather.read_table(cache, columns=columns, memory_map=True)
+
+
+def load_publications(path: str = "data/data_mining_publications.txt", columns: Sequence[str] = None,
+                      cache_dir: str = "data/cache"):
+    """Load the publications as a pandas DataFrame (see `load_table`)."""
+    return load_table(path, columns, cache_dir).to_pandas()
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy import stats
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics import silhouette_score
+from threadpoolctl import threadpool_limits
+
+_X = None  # matrix of the worker process, set once by _init_worker
+
+
+def matrix_fingerprint(X) -> str:
+    """Hash of the contents of a dense or sparse matrix."""
+    h = hashlib.sha1(str(X.shape).encode())
+    if sp.issparse(X):
+        X = sp.csr_matrix(X)
+        for part in (X.data, X.indices, X.indptr):
+            h.update(np.ascontiguousarray(part).tobytes())
+    else:
+        h.update(np.ascontiguousarray(X).tobytes())
+    return h.hexdigest()[:16]
+
+
+def stratified_sample(labels: np.ndarray, sample_size: int, rng: np.random.RandomState) -> np.ndarray:
+    """Indices of a sample with every cluster represented in proportion to its size (at least 2)."""
+    idx = []
+    n = len(labels)
+    for c in np.unique(labels):
+        members = np.flatnonzero(labels == c)
+        size = min(len(members), max(2, int(round(sample_size * len(members) / n))))
+        idx.append(rng.choice(members, size, replace=False))
+    return np.concatenate(idx)
+
+
+def sampled_silhouette(X, labels: np.ndarray, sample_size: int = 2000, n_repeats: int = 5,
+                       seed: int = 0) -> Dict[str, float]:
+    """Silhouette score estimated on stratified samples, with a 95% confidence interval."""
+    rng = np.random.RandomState(seed)
+    if len(np.unique(labels)) < 2:
+        return {"silhouette": np.nan, "ci_low": np.nan, "ci_high": np.nan}
+    scores = []
+    for _ in range(n_repeats):
+        idx = stratified_sample(labels, sample_size, rng)
+        scores.append(silhouette_score(X[idx], labels[idx]))
+    mean = float(np.mean(scores))
+    # Student's t quantile, with few repeats the normal 1.96 gives a too narrow interval
+    half = (float(stats.t.ppf(0.975, n_repeats - 1) * np.std(scores, ddof=1) / np.sqrt(n_repeats))
+            if n_repeats > 1 else np.nan)
+    return {"silhouette": mean, "ci_low": mean - half, "ci_high": mean + half}
+
+
+def _init_worker(X) -> None:
+    global _X
+    _X = X
+
+
+def _evaluate_k(args) -> Dict:
+    k, seed, n_init, minibatch, sample_size, n_repeats, threads = args
+    if minibatch:
+        model = MiniBatchKMeans(n_clusters=k, random_state=seed, n_init=n_init, batch_size=4096)
+    else:
+        model = KMeans(n_clusters=k, random_state=seed, n_init=n_init)
+    # Every worker gets its share of the cores, otherwise each fit would use all of them (OpenMP/BLAS)
+    with threadpool_limits(threads):
+        labels = model.fit_predict(_X)
+        result = {"k": k, "inertia": float(model.inertia_)}
+        result.update(sampled_silhouette(_X, labels, sample_size, n_repeats, seed))
+    return result
+
+
+def sweep(X, ks: Sequence[int], seed: int = 0, n_init: int = 1, minibatch: bool = False,
+          sample_size: int = 2000, n_repeats: int = 5, workers: int = None,
+          cache_dir: str = "data/cache/sweep") -> pd.DataFrame:
+    """Fit k-means for every k in a process pool and return inertia and sampled silhouette per k.
+
+    Results are cached per (k, seed, matrix fingerprint, settings) in
+    `cache_dir`, so extending or repeating a sweep only fits the new k's. The
+    cores are split between the `workers` processes, each fit uses
+    cpu_count // workers threads.
+    """
+    settings = f"n{n_init}_mb{int(minibatch)}_s{sample_size}_r{n_repeats}"
+    fingerprint = matrix_fingerprint(X)
+
+    def cache_path(k):
+        return os.path.join(cache_dir, f"{fingerprint}_{settings}_k{k}_seed{seed}.json")
+
+    results: List[Dict] = []
+    todo = []
+    for k in sorted(set(int(k) for k in ks)):
+        if cache_dir and os.path.exists(cache_path(k)):
+            with open(cache_path(k)) as f:
+                results.append(json.load(f))
+        else:
+            todo.append(k)
+
+    if todo:
+        cores = os.cpu_count() or 1
+        workers = min(workers or cores, len(todo))
+        threads = max(cores // workers, 1)
+        todo = [(k, seed, n_init, minibatch, sample_size, n_repeats, threads) for k in todo]
+        if workers == 1:
+            _init_worker(X)
+            new = list(map(_evaluate_k, todo))
+        else:
+            with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(X,)) as pool:
+                new = list(pool.map(_evaluate_k, todo))
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            for result in new:
+                with open(cache_path(result["k"]), "w") as f:
+                    json.dump(result, f)
+        results.extend(new)
+
+    return pd.DataFrame(results).sort_values("k").reset_index(drop=True)
+
+
+def coarse_to_fine(X, k_min: int, k_max: int, coarse_steps: int = 8, fine_steps: int = 8,
+                   **kwargs) -> pd.DataFrame:
+    """Sweep a coarse grid of k, then a fine grid around the k with the best silhouette."""
+    coarse = np.unique(np.linspace(k_min, k_max, coarse_steps).astype(int))
+    results = sweep(X, coarse, **kwargs)
+    best = int(results.loc[results["silhouette"].idxmax(), "k"])
+    pos = int(np.searchsorted(coarse, best))
+    low = coarse[max(pos - 1, 0)]
+    high = coarse[min(pos + 1, len(coarse) - 1)]
+    fine = np.unique(np.linspace(low, high, fine_steps).astype(int))
+    return sweep(X, np.union1d(coarse, fine), **kwargs)
@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import pickle
+import string
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Iterable, List, Sequence
+
+# Common domain specific words in data mining titles
+DOMAIN_STOPS = {'approach', 'data', 'learn', 'use'}
+
+_PUNCT = str.maketrans(dict.fromkeys(string.punctuation))
+_nltk = {}
+
+# NLTK data used by _tools, as (resource path, download name)
+_NLTK_DATA = [('corpora/stopwords', 'stopwords'), ('tokenizers/punkt', 'punkt'),
+              ('tokenizers/punkt_tab', 'punkt_tab'), ('corpora/wordnet', 'wordnet'),
+              ('corpora/omw-1.4', 'omw-1.4')]
+
+
+def _ensure_nltk_data() -> None:
+    """Download the NLTK data that is missing (before any worker process loads it)."""
+    import nltk
+    for path, name in _NLTK_DATA:
+        try:
+            nltk.data.find(path)
+        except LookupError:
+            nltk.download(name, quiet=True)
+
+
+def _tools():
+    """Load the NLTK tools once per process (only when something has to be normalized)."""
+    if not _nltk:
+        _ensure_nltk_data()
+        from nltk.corpus import stopwords
+        from nltk.tokenize import word_tokenize
+        from nltk.stem import PorterStemmer, WordNetLemmatizer
+        _nltk['stop_words'] = set(stopwords.words('english'))
+        _nltk['tokenize'] = word_tokenize
+        _nltk['stemmer'] = PorterStemmer()
+        _nltk['lemmatizer'] = WordNetLemmatizer()
+    return _nltk
+
+
+@lru_cache(maxsize=None)
+def _stop_words(extra_stopwords: tuple) -> frozenset:
+    return frozenset(_tools()['stop_words'] | set(extra_stopwords))
+
+
+@lru_cache(maxsize=200_000)
+def normalize_word(word: str, method: str = "lemma", pos: str = "v") -> str:
+    """Lemmatize (`method="lemma"`) or stem (`method="stem"`) a single word, memoized."""
+    if method == "lemma":
+        return _tools()['lemmatizer'].lemmatize(word, pos=pos)
+    if method == "stem":
+        return _tools()['stemmer'].stem(word)
+    return word
+
+
+def normalize_title(title: str, method: str = "lemma", pos: str = "v", extra_stopwords: Iterable[str] = (),
+                    filter_on: str = "normalized") -> List[str]:
+    """Lowercase, remove punctuation, tokenize, normalize and remove stop words from a title.
+
+    With `filter_on="normalized"` stop words are removed after normalization
+    (as in test_kmeans.ipynb), with `filter_on="raw"` before (as in test.ipynb).
+    """
+    stop_words = _stop_words(tuple(sorted(extra_stopwords)))
+    tokens = []
+    for word in _tools()['tokenize'](title.lower().translate(_PUNCT)):
+        if filter_on == "raw" and word in stop_words:
+            continue
+        norm = normalize_word(word, method, pos)
+        if filter_on == "normalized" and norm in stop_words:
+            continue
+        tokens.append(norm)
+    return tokens
+
+
+def _normalize_chunk(args) -> List[List[str]]:
+    titles, settings = args
+    return [normalize_title(title, **settings) for title in titles]
+
+
+def cache_key(titles: Sequence[str], settings: dict) -> str:
+    """Key of the preprocessing cache: a hash of the settings and all titles."""
+    h = hashlib.sha1(json.dumps(settings, sort_keys=True).encode('utf-8'))
+    for title in titles:
+        h.update(title.encode('utf-8'))
+        h.update(b'\n')
+    return h.hexdigest()
+
+
+def normalize_titles(titles: Sequence[str], method: str = "lemma", pos: str = "v",
+                     extra_stopwords: Iterable[str] = (), filter_on: str = "normalized",
+                     workers: int = None, chunk_size: int = 5000,
+                     cache_dir: str = "data/cache") -> List[List[str]]:
+    """Return the normalized token list of every title.
+
+    Titles are processed in chunks by a pool of `workers` processes (each with
+    its own lemma/stem cache). The result is stored in `cache_dir`, keyed on
+    the settings and the titles, so later runs load it without NLTK.
+    """
+    settings = {'method': method, 'pos': pos, 'extra_stopwords': sorted(extra_stopwords),
+                'filter_on': filter_on}
+    path = None
+    if cache_dir:
+        path = os.path.join(cache_dir, f"titles_{cache_key(titles, settings)}.pkl")
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+
+    # Download missing NLTK data here, so the workers don't all download it at once
+    _ensure_nltk_data()
+    chunks = [(titles[i:i + chunk_size], settings) for i in range(0, len(titles), chunk_size)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(chunks) == 1:
+        tokens = [t for chunk in map(_normalize_chunk, chunks) for t in chunk]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            tokens = [t for chunk in pool.map(_normalize_chunk, chunks) for t in chunk]
+
+    if path:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump(tokens, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+    return tokens
@@ -0,0 +1,171 @@
+import json
+import os
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+from loader import to_year
+
+
+def _identity(tokens):
+    return tokens
+
+
+def _vectorizer(n_features: int) -> HashingVectorizer:
+    # Token lists in, raw term counts out
+    return HashingVectorizer(analyzer=_identity, n_features=n_features, alternate_sign=False, norm=None)
+
+
+def yearly_batches(token_lists: Iterable[List[str]], years: Iterable, chunk_size: int = 10_000
+                   ) -> Iterator[Tuple[int, List[List[str]], np.ndarray]]:
+    """Stream (year, token lists, document positions) batches of at most `chunk_size` documents.
+
+    Both inputs are consumed lazily, chunk by chunk. Documents without a year are skipped.
+    """
+    pairs = enumerate(zip(token_lists, years))
+    while True:
+        chunk = list(islice(pairs, chunk_size))
+        if not chunk:
+            return
+        per_year: Dict[int, Tuple[list, list]] = {}
+        for position, (tokens, year) in chunk:
+            year = to_year(year)
+            if year is not None:
+                docs, positions = per_year.setdefault(year, ([], []))
+                docs.append(tokens)
+                positions.append(position)
+        for year, (docs, positions) in per_year.items():
+            yield year, docs, np.array(positions, dtype=np.int64)
+
+
+def build_yearly_blocks(batches: Iterable[Tuple], out_dir: str = "data/cache/tfidf",
+                        n_features: int = 2**18, chunk_size: int = 10_000) -> Dict:
+    """Vectorize streamed batches of normalized titles into fixed-width hashed term-count blocks.
+
+    `batches` yields (year, token lists) or (year, token lists, document
+    positions), e.g. from `yearly_batches`; without positions the documents
+    are numbered in stream order. Documents are buffered per year and a year's
+    buffer is vectorized and written as the next part of that year
+    (`year_<year>.<part>.npz` and `.idx.npy`) once it holds `chunk_size`
+    documents, or at the end, so at most `chunk_size` documents per year are
+    in memory. The document frequencies are accumulated over all parts and
+    the IDF weighting is applied when a year is loaded (`load_year`). For
+    readable top terms the first token (in stream order) seen for every used
+    column is kept in `features.json`.
+    """
+    vec = _vectorizer(n_features)
+    df = np.zeros(n_features, dtype=np.int64)
+    features: Dict[int, str] = {}
+    seen = set()
+    parts: Dict[int, int] = {}
+    buffers: Dict[int, Tuple[list, list]] = {}
+    n_docs = 0   # documents in the stream, numbers documents without positions
+    n_years = 0  # documents with a year, the N of the IDF
+    os.makedirs(out_dir, exist_ok=True)
+
+    def flush(year: int) -> None:
+        docs, positions = buffers.pop(year)
+        counts = vec.transform(docs).tocsr()
+        counts.sum_duplicates()
+        df[:] += np.bincount(counts.indices, minlength=n_features)
+        part = parts.get(year, 0)
+        parts[year] = part + 1
+        sp.save_npz(os.path.join(out_dir, f"year_{year}.{part}.npz"), counts)
+        np.save(os.path.join(out_dir, f"year_{year}.{part}.idx.npy"), np.concatenate(positions))
+
+    for batch in batches:
+        year, chunk = to_year(batch[0]), list(batch[1])
+        positions = batch[2] if len(batch) > 2 else np.arange(n_docs, n_docs + len(chunk))
+        n_docs += len(chunk)
+        if year is None or not chunk:
+            continue
+
+        n_years += len(chunk)
+        docs, buffered_positions = buffers.setdefault(year, ([], []))
+        docs.extend(chunk)
+        buffered_positions.append(np.asarray(positions, dtype=np.int64))
+        if len(docs) >= chunk_size:
+            flush(year)
+
+        new_tokens = [t for t in dict.fromkeys(t for tokens in chunk for t in tokens) if t not in seen]
+        if new_tokens:
+            seen.update(new_tokens)
+            columns = vec.transform([[t] for t in new_tokens]).indices
+            for column, token in zip(columns.tolist(), new_tokens):
+                features.setdefault(column, token)
+
+    for year in list(buffers):
+        flush(year)
+
+    np.save(os.path.join(out_dir, "df.npy"), df)
+    meta = {"n_docs": n_years, "n_features": n_features, "years": sorted(parts),
+            "parts": {str(y): n for y, n in parts.items()}}
+    with open(os.path.join(out_dir, "meta.json"), "w") as f:
+        json.dump(meta, f)
+    with open(os.path.join(out_dir, "features.json"), "w") as f:
+        json.dump({str(k): v for k, v in features.items()}, f)
+    return meta
+
+
+def idf(out_dir: str = "data/cache/tfidf", smooth_idf: bool = True) -> np.ndarray:
+    """IDF weights from the accumulated document frequencies (same formula as TfidfVectorizer)."""
+    n = _meta(out_dir)["n_docs"]
+    df = np.load(os.path.join(out_dir, "df.npy"))
+    if smooth_idf:
+        return np.log((1 + n) / (1 + df)) + 1
+    with np.errstate(divide="ignore"):
+        return np.log(n / df) + 1
+
+
+def _meta(out_dir: str) -> Dict:
+    with open(os.path.join(out_dir, "meta.json")) as f:
+        return json.load(f)
+
+
+def _parts(year: int, out_dir: str) -> List[str]:
+    """Path prefixes of the parts of a year (none for a year without documents)."""
+    n = _meta(out_dir)["parts"].get(str(to_year(year)), 0)
+    return [os.path.join(out_dir, f"year_{to_year(year)}.{part}") for part in range(n)]
+
+
+def year_positions(year: int, out_dir: str = "data/cache/tfidf") -> np.ndarray:
+    """Original document positions of the rows of `load_year(year)`."""
+    parts = [np.load(prefix + ".idx.npy") for prefix in _parts(year, out_dir)]
+    return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+
+def load_year(year: int, out_dir: str = "data/cache/tfidf", norm: str = "l2", sublinear_tf: bool = False,
+              smooth_idf: bool = True, weights: np.ndarray = None) -> sp.csr_matrix:
+    """Load the TF-IDF block of one year (pass `weights=idf(out_dir)` when loading many years)."""
+    blocks = [sp.load_npz(prefix + ".npz") for prefix in _parts(year, out_dir)]
+    if not blocks:
+        raise ValueError(f'no documents for year {year} in {out_dir}')
+    X = sp.vstack(blocks, format="csr").astype(np.float64)
+    if sublinear_tf:
+        X.data = np.log(X.data) + 1
+    if weights is None:
+        weights = idf(out_dir, smooth_idf)
+    X = X @ sp.diags(weights)
+    return normalize(X, norm=norm) if norm else X.tocsr()
+
+
+def load_years(years: Iterable[int] = None, out_dir: str = "data/cache/tfidf", **kwargs):
+    """Load and stack the TF-IDF blocks of several years (all by default).
+
+    Returns the matrix and the original document positions of its rows.
+    """
+    years = _meta(out_dir)["years"] if years is None else list(years)
+    weights = idf(out_dir, kwargs.pop("smooth_idf", True))
+    blocks = [load_year(y, out_dir, weights=weights, **kwargs) for y in years]
+    idx = np.concatenate([year_positions(y, out_dir) for y in years])
+    return sp.vstack(blocks, format="csr"), idx
+
+
+def feature_names(out_dir: str = "data/cache/tfidf") -> Dict[int, str]:
+    """Column -> token for every used column of the hashed feature space."""
+    with open(os.path.join(out_dir, "features.json")) as f:
+        return {int(k): v for k, v in json.load(f).items()}